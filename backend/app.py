@@ -1,6 +1,7 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from database import Database
+from db_instance import db
+from json_provider import OrjsonProvider
 from routes.auth import auth_bp
 from routes.chat import chat_bp
 import os
@@ -8,20 +9,27 @@ import os
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
 
+# Serialize all jsonify() responses with orjson
+app.json = OrjsonProvider(app)
+
 # Enable CORS for all domains on all routes
 CORS(app)
 
-# Initialize database
-db = Database()
+# Initialize database tables
+db.init_db()
 
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(chat_bp, url_prefix='/api/chat')
 
+# Health check body is constant, so encode it once at import time
+HEALTH_RESPONSE_BODY = b'{"status":"healthy","message":"E2EE Chat API is running"}'
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({"status": "healthy", "message": "E2EE Chat API is running"})
+    # A fresh Response per request, since CORS and other hooks add headers to it
+    return Response(HEALTH_RESPONSE_BODY, mimetype='application/json')
 
 @app.errorhandler(400)
 def bad_request(error):
@@ -40,8 +48,5 @@ def internal_error(error):
     return jsonify({"error": "Internal server error"}), 500
 
 if __name__ == '__main__':
-    # Initialize database tables
-    db.init_db()
-    
     # Run the application
     app.run(debug=True, port=5000, host='0.0.0.0')
\ No newline at end of file
@@ -1,209 +1,381 @@
 import sqlite3
 import json
+import os
+import queue
+import redis
 from datetime import datetime
+from enum import Enum
 from typing import List, Dict, Optional
 
+# Hot statements kept as constants so each connection's statement cache
+# reuses the compiled plan instead of re-parsing the SQL
+SQL_GET_USER = 'SELECT * FROM users WHERE username = ?'
+SQL_GET_USER_PUBLIC_KEY = 'SELECT public_key FROM users WHERE username = ?'
+SQL_GET_SESSION = 'SELECT * FROM sessions WHERE session_token = ? AND expires_at > CURRENT_TIMESTAMP'
+SQL_DELETE_SESSION = 'DELETE FROM sessions WHERE session_token = ?'
+SQL_SEARCH_USERS = '''
+    SELECT username FROM users 
+    WHERE username LIKE ? AND username != ?
+    ORDER BY username
+    LIMIT 10
+'''
+SQL_STORE_MESSAGE = '''
+    INSERT INTO messages (sender_username, receiver_username, encrypted_content, iv, encrypted_session_key)
+    SELECT ?, ?, ?, ?, ?
+    WHERE EXISTS (SELECT 1 FROM users WHERE username = ?)
+'''
+SQL_GET_ALL_USERS = '''
+    SELECT username FROM users 
+    WHERE username != ?
+    ORDER BY username
+'''
+
+class StoreResult(Enum):
+    """Outcome of storing a message"""
+    STORED = 'stored'
+    RECEIVER_NOT_FOUND = 'receiver_not_found'
+    ERROR = 'error'
+
+PUBLIC_KEY_CACHE_MAX_SIZE = 4096
+
 class Database:
-    def __init__(self, db_path='chat.db'):
+    def __init__(self, db_path='chat.db', pool_size=10):
         self.db_path = db_path
+        # Pool of reusable connections, so requests don't reopen the DB file
+        self.pool = queue.Queue(maxsize=pool_size)
+        
+        # Sessions live in Redis (with native TTL) when REDIS_URL is set;
+        # otherwise they fall back to the SQLite sessions table
+        redis_url = os.environ.get('REDIS_URL')
+        self.redis = redis.Redis.from_url(redis_url, decode_responses=True) if redis_url else None
+        
+        # Public keys never change after registration, so they can be cached
+        # without expiry (username -> public key, oldest evicted first)
+        self.public_key_cache = {}
         
     def get_connection(self):
-        """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
+        """Get a database connection from the pool (or open a new one)"""
+        try:
+            return self.pool.get_nowait()
+        except queue.Empty:
+            pass
+        
+        # Autocommit mode so a pooled connection never carries an open transaction
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=256
+        )
         conn.row_factory = sqlite3.Row  # Enable dict-like access
+
+        # Tune the connection once when it is opened; pooled reuse skips this.
+        # WAL lets readers proceed while a message is being written.
+        conn.executescript('''
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA mmap_size=268435456;
+            PRAGMA cache_size=-65536;
+            PRAGMA foreign_keys=ON;
+        ''')
         return conn
     
+    def release(self, conn):
+        """Return a connection to the pool (closes it if the pool is full)"""
+        if conn.in_transaction:
+            conn.rollback()
+        
+        try:
+            self.pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+    
     def init_db(self):
         """Initialize database tables"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Users table - stores username, hashed password, and public key
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                public_key TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Messages table - stores only encrypted messages
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sender_username TEXT NOT NULL,
-                receiver_username TEXT NOT NULL,
-                encrypted_content TEXT NOT NULL,
-                iv TEXT NOT NULL,
-                encrypted_session_key TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (sender_username) REFERENCES users (username),
-                FOREIGN KEY (receiver_username) REFERENCES users (username)
-            )
-        ''')
-        
-        # Sessions table - for managing user sessions
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL,
-                session_token TEXT UNIQUE NOT NULL,
-                expires_at TIMESTAMP NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (username) REFERENCES users (username)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        try:
+            cursor = conn.cursor()
+            
+            # Users table - stores username, hashed password, and public key
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    password_hash TEXT NOT NULL,
+                    public_key TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Messages table - stores only encrypted messages
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    sender_username TEXT NOT NULL,
+                    receiver_username TEXT NOT NULL,
+                    encrypted_content TEXT NOT NULL,
+                    iv TEXT NOT NULL,
+                    encrypted_session_key TEXT,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (sender_username) REFERENCES users (username),
+                    FOREIGN KEY (receiver_username) REFERENCES users (username)
+                )
+            ''')
+            
+            # Sessions table - for managing user sessions
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT NOT NULL,
+                    session_token TEXT UNIQUE NOT NULL,
+                    expires_at TIMESTAMP NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (username) REFERENCES users (username)
+                )
+            ''')
+            
+            # Indexes for conversation, session and username lookups
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_msg_pair_ts
+                ON messages (sender_username, receiver_username, timestamp)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_msg_recv_ts
+                ON messages (receiver_username, sender_username, timestamp)
+            ''')
+            cursor.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_sessions_token
+                ON sessions (session_token, expires_at)
+            ''')
+            # NOCASE so the (case-insensitive) prefix LIKE in search_users can use it
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_users_username
+                ON users (username COLLATE NOCASE)
+            ''')
+        finally:
+            self.release(conn)
     
     def create_user(self, username: str, password_hash: str, public_key: str) -> bool:
         """Create a new user"""
+        conn = self.get_connection()
         try:
-            conn = self.get_connection()
             cursor = conn.cursor()
             
             cursor.execute(
                 'INSERT INTO users (username, password_hash, public_key) VALUES (?, ?, ?)',
                 (username, password_hash, public_key)
             )
-            
-            conn.commit()
-            conn.close()
             return True
         except sqlite3.IntegrityError:
-            conn.close()
             return False  # Username already exists
+        finally:
+            self.release(conn)
     
     def get_user(self, username: str) -> Optional[Dict]:
         """Get user by username"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM users WHERE username = ?', (username,))
-        row = cursor.fetchone()
-        
-        conn.close()
+        try:
+            row = conn.execute(SQL_GET_USER, (username,)).fetchone()
+        finally:
+            self.release(conn)
         
         if row:
             return dict(row)
         return None
     
     def get_user_public_key(self, username: str) -> Optional[str]:
-        """Get user's public key"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        """Get user's public key (cached in memory and in Redis if configured)"""
+        public_key = self.public_key_cache.get(username)
+        if public_key:
+            return public_key
+        
+        if self.redis:
+            public_key = self.redis.get(f"pk:{username}")
         
-        cursor.execute('SELECT public_key FROM users WHERE username = ?', (username,))
-        row = cursor.fetchone()
+        if not public_key:
+            conn = self.get_connection()
+            try:
+                row = conn.execute(SQL_GET_USER_PUBLIC_KEY, (username,)).fetchone()
+            finally:
+                self.release(conn)
+            
+            # Unknown users are not cached, they may still register
+            if not row:
+                return None
+            
+            public_key = row['public_key']
+            if self.redis:
+                self.redis.set(f"pk:{username}", public_key)
         
-        conn.close()
+        if len(self.public_key_cache) >= PUBLIC_KEY_CACHE_MAX_SIZE:
+            self.public_key_cache.pop(next(iter(self.public_key_cache)), None)
+        self.public_key_cache[username] = public_key
         
-        if row:
-            return row['public_key']
-        return None
+        return public_key
     
-    def store_message(self, sender: str, receiver: str, encrypted_content: str, iv: str, encrypted_session_key: str = None) -> bool:
-        """Store encrypted message"""
+    def store_message(self, sender: str, receiver: str, encrypted_content: str, iv: str, encrypted_session_key: str = None) -> StoreResult:
+        """Store encrypted message (only if the receiver exists)"""
+        conn = self.get_connection()
         try:
-            conn = self.get_connection()
             cursor = conn.cursor()
             
-            cursor.execute(
-                'INSERT INTO messages (sender_username, receiver_username, encrypted_content, iv, encrypted_session_key) VALUES (?, ?, ?, ?, ?)',
-                (sender, receiver, encrypted_content, iv, encrypted_session_key)
-            )
+            # Receiver check and insert in a single statement
+            cursor.execute(SQL_STORE_MESSAGE, (sender, receiver, encrypted_content, iv, encrypted_session_key, receiver))
             
-            conn.commit()
-            conn.close()
-            return True
+            if cursor.rowcount == 0:
+                return StoreResult.RECEIVER_NOT_FOUND
+            return StoreResult.STORED
         except Exception as e:
             print(f"Error storing message: {e}")
-            conn.close()
-            return False
+            return StoreResult.ERROR
+        finally:
+            self.release(conn)
     
-    def get_messages(self, username: str, other_username: str = None) -> List[Dict]:
-        """Get messages for a user (optionally filtered by conversation partner)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def store_messages_bulk(self, rows: List[tuple]) -> StoreResult:
+        """Store several encrypted messages in one transaction
         
-        if other_username:
-            # Get messages between two specific users
-            cursor.execute('''
-                SELECT * FROM messages 
-                WHERE (sender_username = ? AND receiver_username = ?) 
-                   OR (sender_username = ? AND receiver_username = ?)
-                ORDER BY timestamp ASC
-            ''', (username, other_username, other_username, username))
-        else:
-            # Get all messages for the user
-            cursor.execute('''
-                SELECT * FROM messages 
-                WHERE sender_username = ? OR receiver_username = ?
-                ORDER BY timestamp ASC
-            ''', (username, username))
+        Each row is (sender, receiver, encrypted_content, iv, encrypted_session_key).
+        Nothing is stored if any receiver does not exist.
+        """
+        conn = self.get_connection()
+        try:
+            # Take the write lock up front; one commit (fsync) for the whole batch
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.executemany(SQL_STORE_MESSAGE, [(*row, row[1]) for row in rows])
+            
+            if cursor.rowcount != len(rows):
+                conn.rollback()
+                return StoreResult.RECEIVER_NOT_FOUND
+            
+            conn.commit()
+            return StoreResult.STORED
+        except Exception as e:
+            print(f"Error storing messages: {e}")
+            return StoreResult.ERROR
+        finally:
+            self.release(conn)
+    
+    def get_messages(self, username: str, other_username: str = None, before_id: int = None, limit: int = 50) -> List[Dict]:
+        """Get a page of messages for a user (optionally filtered by conversation partner)
         
-        rows = cursor.fetchall()
-        conn.close()
+        Returns up to `limit` messages with an id below `before_id` (newest page
+        if not given), in chronological order.
+        """
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            
+            if other_username:
+                # Get messages between two specific users
+                cursor.execute('''
+                    SELECT id, sender_username, receiver_username, encrypted_content, iv, encrypted_session_key, timestamp
+                    FROM messages 
+                    WHERE ((sender_username = ?1 AND receiver_username = ?2) 
+                       OR (sender_username = ?2 AND receiver_username = ?1))
+                      AND (?3 IS NULL OR id < ?3)
+                    ORDER BY id DESC
+                    LIMIT ?4
+                ''', (username, other_username, before_id, limit))
+            else:
+                # Get all messages for the user
+                cursor.execute('''
+                    SELECT id, sender_username, receiver_username, encrypted_content, iv, encrypted_session_key, timestamp
+                    FROM messages 
+                    WHERE (sender_username = ?1 OR receiver_username = ?1)
+                      AND (?2 IS NULL OR id < ?2)
+                    ORDER BY id DESC
+                    LIMIT ?3
+                ''', (username, before_id, limit))
+            
+            rows = cursor.fetchall()
+        finally:
+            self.release(conn)
         
-        return [dict(row) for row in rows]
+        # Paged by id, not timestamp: CURRENT_TIMESTAMP only has one-second
+        # resolution, so many messages (e.g. a bulk send) can share a timestamp.
+        # Fetched newest first so LIMIT keeps the latest page; return oldest first
+        return [dict(row) for row in reversed(rows)]
     
     def get_conversations(self, username: str) -> List[Dict]:
-        """Get list of users the current user has conversations with"""
+        """Get list of users the current user has conversations with, including the last message"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT DISTINCT 
-                CASE 
-                    WHEN sender_username = ? THEN receiver_username 
-                    ELSE sender_username 
-                END as contact_username,
-                MAX(timestamp) as last_message_time
-            FROM messages 
-            WHERE sender_username = ? OR receiver_username = ?
-            GROUP BY contact_username
-            ORDER BY last_message_time DESC
-        ''', (username, username, username))
-        
-        rows = cursor.fetchall()
-        conn.close()
+        try:
+            cursor = conn.cursor()
+            
+            # One pass: keep only the newest message per contact
+            cursor.execute('''
+                SELECT contact_username, encrypted_content, iv, last_message_time
+                FROM (
+                    SELECT 
+                        CASE 
+                            WHEN sender_username = ?1 THEN receiver_username 
+                            ELSE sender_username 
+                        END as contact_username,
+                        encrypted_content,
+                        iv,
+                        timestamp as last_message_time,
+                        ROW_NUMBER() OVER (
+                            PARTITION BY CASE 
+                                WHEN sender_username = ?1 THEN receiver_username 
+                                ELSE sender_username 
+                            END
+                            ORDER BY timestamp DESC, id DESC
+                        ) as rn
+                    FROM messages 
+                    WHERE sender_username = ?1 OR receiver_username = ?1
+                )
+                WHERE rn = 1
+                ORDER BY last_message_time DESC
+            ''', (username,))
+            
+            rows = cursor.fetchall()
+        finally:
+            self.release(conn)
         
         return [dict(row) for row in rows]
     
     def create_session(self, username: str, session_token: str, expires_at: datetime) -> bool:
         """Create a user session"""
+        if self.redis:
+            try:
+                ttl = int((expires_at - datetime.now()).total_seconds())
+                session = {"username": username, "expires_at": str(expires_at)}
+                self.redis.setex(f"sess:{session_token}", ttl, json.dumps(session))
+                return True
+            except Exception as e:
+                print(f"Error creating session: {e}")
+                return False
+        
+        conn = self.get_connection()
         try:
-            conn = self.get_connection()
             cursor = conn.cursor()
             
             cursor.execute(
                 'INSERT INTO sessions (username, session_token, expires_at) VALUES (?, ?, ?)',
                 (username, session_token, expires_at)
             )
-            
-            conn.commit()
-            conn.close()
             return True
         except Exception as e:
             print(f"Error creating session: {e}")
-            conn.close()
             return False
+        finally:
+            self.release(conn)
     
     def get_session(self, session_token: str) -> Optional[Dict]:
         """Get session by token"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        if self.redis:
+            # Expired sessions are dropped by Redis itself
+            session = self.redis.get(f"sess:{session_token}")
+            if session:
+                return json.loads(session)
+            return None
         
-        cursor.execute(
-            'SELECT * FROM sessions WHERE session_token = ? AND expires_at > CURRENT_TIMESTAMP',
-            (session_token,)
-        )
-        row = cursor.fetchone()
-        
-        conn.close()
+        conn = self.get_connection()
+        try:
+            row = conn.execute(SQL_GET_SESSION, (session_token,)).fetchone()
+        finally:
+            self.release(conn)
         
         if row:
             return dict(row)
@@ -211,60 +383,48 @@ class Database:
     
     def delete_session(self, session_token: str) -> bool:
         """Delete a session (logout)"""
+        if self.redis:
+            try:
+                self.redis.delete(f"sess:{session_token}")
+                return True
+            except Exception as e:
+                print(f"Error deleting session: {e}")
+                return False
+        
+        conn = self.get_connection()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('DELETE FROM sessions WHERE session_token = ?', (session_token,))
-            
-            conn.commit()
-            conn.close()
+            conn.execute(SQL_DELETE_SESSION, (session_token,))
             return True
         except Exception as e:
             print(f"Error deleting session: {e}")
-            conn.close()
             return False
+        finally:
+            self.release(conn)
     
     def search_users(self, query: str, current_user: str) -> List[str]:
         """Search for users by username (excluding current user)"""
+        conn = self.get_connection()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Search for usernames that contain the query (case-insensitive)
-            cursor.execute('''
-                SELECT username FROM users 
-                WHERE username LIKE ? AND username != ?
-                ORDER BY username
-                LIMIT 10
-            ''', (f'%{query}%', current_user))
-            
-            rows = cursor.fetchall()
-            conn.close()
+            # Search for usernames that start with the query (case-insensitive).
+            # A prefix pattern can be served from idx_users_username.
+            rows = conn.execute(SQL_SEARCH_USERS, (f'{query}%', current_user)).fetchall()
             
             return [row['username'] for row in rows]
         except Exception as e:
             print(f"Error searching users: {e}")
-            conn.close()
             return []
+        finally:
+            self.release(conn)
     
     def get_all_users(self, current_user: str) -> List[str]:
         """Get all users except the current user"""
+        conn = self.get_connection()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT username FROM users 
-                WHERE username != ?
-                ORDER BY username
-            ''', (current_user,))
-            
-            rows = cursor.fetchall()
-            conn.close()
+            rows = conn.execute(SQL_GET_ALL_USERS, (current_user,)).fetchall()
             
             return [row['username'] for row in rows]
         except Exception as e:
             print(f"Error getting all users: {e}")
-            conn.close()
-            return []
\ No newline at end of file
+            return []
+        finally:
+            self.release(conn)
\ No newline at end of file
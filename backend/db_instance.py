@@ -0,0 +1,4 @@
+from database import Database
+
+# Shared database instance, so the whole app uses a single connection pool
+db = Database()
@@ -0,0 +1,11 @@
+import multiprocessing
+
+# Production server: gunicorn -c gunicorn.conf.py
+# The gevent worker monkey-patches the standard library itself before the
+# app is loaded, so each worker multiplexes many requests as greenlets.
+wsgi_app = 'app:app'
+bind = '0.0.0.0:5000'
+
+worker_class = 'gevent'
+workers = multiprocessing.cpu_count() * 2 + 1
+worker_connections = 1000
\ No newline at end of file
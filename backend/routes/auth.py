@@ -1,41 +1,78 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
-from database import Database
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
+from pydantic import ValidationError
+from db_instance import db
+from schemas import RegisterIn, LoginIn, validation_error_message
 import secrets
+import time
 from datetime import datetime, timedelta
 
 auth_bp = Blueprint('auth', __name__)
-db = Database()
+
+# In-process session cache: session_token -> (session, cached_until)
+# Saves a SQLite lookup on every authenticated request.
+SESSION_CACHE_TTL = 60  # seconds
+SESSION_CACHE_MAX_SIZE = 10000
+_session_cache = {}
+
+# Argon2id password hashing; werkzeug hashes from older accounts are still accepted
+password_hasher = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=2)
+
+def verify_password(password_hash, password):
+    """Check a password against a stored argon2 or legacy werkzeug hash"""
+    if not password_hash.startswith('$argon2'):
+        return check_password_hash(password_hash, password)
+    
+    try:
+        return password_hasher.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def get_valid_session(session_token):
+    """Get a valid session by token, checking the in-memory cache first"""
+    now = time.time()
+    
+    cached = _session_cache.get(session_token)
+    if cached and cached[1] > now:
+        return cached[0]
+    
+    session = db.get_session(session_token)
+    if not session:
+        _session_cache.pop(session_token, None)
+        return None
+    
+    # Never cache a session past its own expiry
+    expires_at = datetime.fromisoformat(str(session['expires_at']))
+    ttl = min(SESSION_CACHE_TTL, (expires_at - datetime.now()).total_seconds())
+    if ttl > 0:
+        if len(_session_cache) >= SESSION_CACHE_MAX_SIZE:
+            for token, (_, cached_until) in list(_session_cache.items()):
+                if cached_until <= now:
+                    _session_cache.pop(token, None)
+            if len(_session_cache) >= SESSION_CACHE_MAX_SIZE:
+                _session_cache.clear()
+        _session_cache[session_token] = (session, now + ttl)
+    
+    return session
 
 @auth_bp.route('/register', methods=['POST'])
 def register():
     """Register a new user with username, password, and public key"""
     try:
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['username', 'password', 'public_key']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
+        # Validate required fields, username format and password strength
+        try:
+            data = RegisterIn.model_validate(request.get_json())
+        except ValidationError as e:
+            return jsonify({"error": validation_error_message(e)}), 400
         
-        username = data['username'].strip()
-        password = data['password']
-        public_key = data['public_key']
-        
-        # Validate username length and characters
-        if len(username) < 3 or len(username) > 50:
-            return jsonify({"error": "Username must be between 3 and 50 characters"}), 400
-        
-        if not username.replace('_', '').replace('-', '').isalnum():
-            return jsonify({"error": "Username can only contain letters, numbers, hyphens, and underscores"}), 400
-        
-        # Validate password strength
-        if len(password) < 6:
-            return jsonify({"error": "Password must be at least 6 characters long"}), 400
+        username = data.username
+        password = data.password
+        public_key = data.public_key
         
         # Hash the password
-        password_hash = generate_password_hash(password)
+        password_hash = password_hasher.hash(password)
         
         # Try to create the user
         success = db.create_user(username, password_hash, public_key)
@@ -56,14 +93,14 @@ def register():
 def login():
     """Login user and create session"""
     try:
-        data = request.get_json()
-        
         # Validate required fields
-        if 'username' not in data or 'password' not in data:
+        try:
+            data = LoginIn.model_validate(request.get_json())
+        except ValidationError:
             return jsonify({"error": "Username and password are required"}), 400
         
-        username = data['username'].strip()
-        password = data['password']
+        username = data.username
+        password = data.password
         
         # Get user from database
         user = db.get_user(username)
@@ -72,7 +109,7 @@ def login():
             return jsonify({"error": "Invalid username or password"}), 401
         
         # Check password
-        if not check_password_hash(user['password_hash'], password):
+        if not verify_password(user['password_hash'], password):
             return jsonify({"error": "Invalid username or password"}), 401
         
         # Create session
@@ -107,6 +144,7 @@ def logout():
         session_token = auth_header.split(' ')[1]
         
         # Delete the session
+        _session_cache.pop(session_token, None)
         success = db.delete_session(session_token)
         
         if success:
@@ -130,7 +168,7 @@ def verify_session():
         session_token = auth_header.split(' ')[1]
         
         # Check if session exists and is valid
-        session = db.get_session(session_token)
+        session = get_valid_session(session_token)
         
         if session:
             return jsonify({
@@ -159,7 +197,7 @@ def require_auth(f):
         session_token = auth_header.split(' ')[1]
         
         # Check if session exists and is valid
-        session = db.get_session(session_token)
+        session = get_valid_session(session_token)
         
         if not session:
             return jsonify({"error": "Invalid or expired session"}), 401
@@ -1,9 +1,52 @@
 from flask import Blueprint, request, jsonify
 from routes.auth import require_auth
-from database import Database
+from pydantic import ValidationError
+from database import StoreResult
+from db_instance import db
+from schemas import SendMessageIn, validation_error_message
 
 chat_bp = Blueprint('chat', __name__)
-db = Database()
+
+MAX_MESSAGES_PAGE_SIZE = 200
+MAX_BULK_MESSAGES = 100
+
+def store_bulk(messages):
+    """Validate and store a batch of encrypted messages from the current user"""
+    if not isinstance(messages, list) or not messages:
+        return jsonify({"error": "Messages must be a non-empty list"}), 400
+    
+    if len(messages) > MAX_BULK_MESSAGES:
+        return jsonify({"error": f"Cannot send more than {MAX_BULK_MESSAGES} messages at once"}), 400
+    
+    sender_username = request.current_user
+    rows = []
+    for msg in messages:
+        try:
+            msg = SendMessageIn.model_validate(msg)
+        except ValidationError as e:
+            return jsonify({"error": validation_error_message(e)}), 400
+        
+        rows.append((
+            sender_username,
+            msg.receiver_username,
+            msg.encrypted_content,
+            msg.iv,
+            msg.encrypted_session_key
+        ))
+    
+    # All messages are stored in a single transaction (or none are)
+    result = db.store_messages_bulk(rows)
+    
+    if result == StoreResult.STORED:
+        return jsonify({
+            "message": "Messages sent successfully",
+            "sender": sender_username,
+            "count": len(rows)
+        }), 201
+    elif result == StoreResult.RECEIVER_NOT_FOUND:
+        return jsonify({"error": "Receiver not found"}), 404
+    else:
+        return jsonify({"error": "Failed to send messages"}), 500
 
 @chat_bp.route('/users', methods=['GET'])
 @require_auth
@@ -46,36 +89,36 @@ def get_public_key(username):
 @chat_bp.route('/send', methods=['POST'])
 @require_auth
 def send_message():
-    """Send an encrypted message"""
+    """Send an encrypted message (or a list of messages as one batch)"""
     try:
         data = request.get_json()
         
+        if isinstance(data, list):
+            return store_bulk(data)
+        
         # Validate required fields
-        required_fields = ['receiver_username', 'encrypted_content', 'iv']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
+        try:
+            msg = SendMessageIn.model_validate(data)
+        except ValidationError as e:
+            return jsonify({"error": validation_error_message(e)}), 400
         
         sender_username = request.current_user
-        receiver_username = data['receiver_username']
-        encrypted_content = data['encrypted_content']
-        iv = data['iv']
-        encrypted_session_key = data.get('encrypted_session_key')  # Optional for first message
-        
-        # Check if receiver exists
-        receiver = db.get_user(receiver_username)
-        if not receiver:
-            return jsonify({"error": "Receiver not found"}), 404
+        receiver_username = msg.receiver_username
+        encrypted_content = msg.encrypted_content
+        iv = msg.iv
+        encrypted_session_key = msg.encrypted_session_key
         
-        # Store the encrypted message
-        success = db.store_message(sender_username, receiver_username, encrypted_content, iv, encrypted_session_key)
+        # Store the encrypted message (also checks that the receiver exists)
+        result = db.store_message(sender_username, receiver_username, encrypted_content, iv, encrypted_session_key)
         
-        if success:
+        if result == StoreResult.STORED:
             return jsonify({
                 "message": "Message sent successfully",
                 "sender": sender_username,
                 "receiver": receiver_username
             }), 201
+        elif result == StoreResult.RECEIVER_NOT_FOUND:
+            return jsonify({"error": "Receiver not found"}), 404
         else:
             return jsonify({"error": "Failed to send message"}), 500
             
@@ -83,15 +126,31 @@ def send_message():
         print(f"Error sending message: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
+@chat_bp.route('/send-bulk', methods=['POST'])
+@require_auth
+def send_messages_bulk():
+    """Send several encrypted messages in one request"""
+    try:
+        data = request.get_json()
+        
+        return store_bulk(data.get('messages') if isinstance(data, dict) else data)
+        
+    except Exception as e:
+        print(f"Error sending messages: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
 @chat_bp.route('/messages', methods=['GET'])
 @require_auth
 def get_messages():
-    """Get messages for the authenticated user"""
+    """Get a page of messages for the authenticated user"""
     try:
         username = request.current_user
         other_username = request.args.get('with')  # Optional: filter by conversation partner
+        before_id = request.args.get('before_id', type=int)  # Optional: only messages older than this message id
+        limit = request.args.get('limit', 50, type=int)
+        limit = max(1, min(limit, MAX_MESSAGES_PAGE_SIZE))
         
-        messages = db.get_messages(username, other_username)
+        messages = db.get_messages(username, other_username, before_id, limit)
         
         return jsonify({
             "messages": messages,
@@ -0,0 +1,47 @@
+from typing import Optional
+from pydantic import BaseModel, StringConstraints, ValidationError
+from typing_extensions import Annotated
+
+# Request body schemas, validated by pydantic's compiled (Rust) core
+
+Username = Annotated[str, StringConstraints(
+    strip_whitespace=True, min_length=3, max_length=50, pattern=r'^[A-Za-z0-9_-]+$'
+)]
+RequiredStr = Annotated[str, StringConstraints(min_length=1)]
+
+class RegisterIn(BaseModel):
+    username: Username
+    password: Annotated[str, StringConstraints(min_length=6)]
+    public_key: RequiredStr
+
+class LoginIn(BaseModel):
+    username: Annotated[str, StringConstraints(strip_whitespace=True)]
+    password: str
+
+class SendMessageIn(BaseModel):
+    receiver_username: RequiredStr
+    encrypted_content: RequiredStr
+    iv: RequiredStr
+    encrypted_session_key: Optional[str] = None  # Optional for first message
+
+# Friendlier messages for specific (field, error type) failures
+ERROR_MESSAGES = {
+    ('username', 'string_too_short'): "Username must be between 3 and 50 characters",
+    ('username', 'string_too_long'): "Username must be between 3 and 50 characters",
+    ('username', 'string_pattern_mismatch'): "Username can only contain letters, numbers, hyphens, and underscores",
+    ('password', 'string_too_short'): "Password must be at least 6 characters long",
+}
+
+def validation_error_message(error: ValidationError) -> str:
+    """Turn the first validation error into a user-facing message"""
+    err = error.errors()[0]
+    if not err['loc']:
+        return "Invalid request body"
+
+    field = str(err['loc'][0])
+    if (field, err['type']) in ERROR_MESSAGES:
+        return ERROR_MESSAGES[(field, err['type'])]
+
+    if err['type'] in ('missing', 'string_too_short'):
+        return f"Missing required field: {field}"
+    return f"Invalid field: {field}"
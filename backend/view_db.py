@@ -1,20 +1,29 @@
+import argparse
 import sqlite3
 
+parser = argparse.ArgumentParser(description='Print the encrypted messages stored in chat.db')
+parser.add_argument('--limit', type=int, help='Only show the first N messages')
+args = parser.parse_args()
+
 conn = sqlite3.connect('chat.db')
-cursor = conn.cursor()
+conn.row_factory = sqlite3.Row
 
-cursor.execute('SELECT * FROM messages')
-messages = cursor.fetchall()
+query = 'SELECT id, sender_username, receiver_username, encrypted_content, iv, encrypted_session_key, timestamp FROM messages'
+params = ()
+if args.limit is not None:
+    query += ' LIMIT ?'
+    params = (args.limit,)
 
 print("=== ENCRYPTED MESSAGES ===\n")
-for msg in messages:
-    print(f"ID: {msg[0]}")
-    print(f"From: {msg[1]} → To: {msg[2]}")
-    print(f"Encrypted Content: {msg[3][:50]}...")
-    print(f"IV: {msg[4][:30]}...")
-    if msg[5]:
-        print(f"Encrypted Session Key: {msg[5][:50]}...")
-    print(f"Timestamp: {msg[6]}")
+# Iterate the cursor directly so rows are streamed instead of loaded all at once
+for msg in conn.execute(query, params):
+    print(f"ID: {msg['id']}")
+    print(f"From: {msg['sender_username']} → To: {msg['receiver_username']}")
+    print(f"Encrypted Content: {msg['encrypted_content'][:50]}...")
+    print(f"IV: {msg['iv'][:30]}...")
+    if msg['encrypted_session_key']:
+        print(f"Encrypted Session Key: {msg['encrypted_session_key'][:50]}...")
+    print(f"Timestamp: {msg['timestamp']}")
     print("-" * 60)
 
 conn.close()
\ No newline at end of file
@@ -3,6 +3,9 @@ import ContactList from './ContactList';
 import { chatAPI } from '../utils/api';
 import { ChatCrypto, KeyStorage } from '../utils/crypto';
 
+// Page size used by the messages API when no limit is given
+const MESSAGES_PAGE_SIZE = 50;
+
 function ChatWindow({ user, onLogout }) {
   const [conversations, setConversations] = useState([]);
   const [activeConversation, setActiveConversation] = useState(null);
@@ -10,11 +13,14 @@ function ChatWindow({ user, onLogout }) {
   const [newMessage, setNewMessage] = useState('');
   const [isLoading, setIsLoading] = useState(false);
   const [isSending, setIsSending] = useState(false);
+  const [hasOlderMessages, setHasOlderMessages] = useState(false);
+  const [isLoadingOlder, setIsLoadingOlder] = useState(false);
   
-  // Refs to track message count and prevent unnecessary re-renders
-  const lastMessageCountRef = useRef(0);
+  // Refs to track the latest message and prevent unnecessary re-renders
+  const lastMessageIdRef = useRef(null);
   const messagesEndRef = useRef(null);
   const pollingIntervalRef = useRef(null);
+  const skipScrollRef = useRef(false);
 
   useEffect(() => {
     loadConversations();
@@ -41,6 +47,11 @@ function ChatWindow({ user, onLogout }) {
 
   // Auto-scroll to bottom when new messages arrive
   useEffect(() => {
+    // Don't jump to the bottom when older messages are prepended
+    if (skipScrollRef.current) {
+      skipScrollRef.current = false;
+      return;
+    }
     scrollToBottom();
   }, [messages]);
 
@@ -57,6 +68,40 @@ function ChatWindow({ user, onLogout }) {
     }
   };
 
+  const decryptMessages = async (messages) => {
+    const { SimpleCrypto } = await import('../utils/simple-crypto');
+    
+    return Promise.all(
+      messages.map(async (msg) => {
+        try {
+          const isReceived = msg.sender_username !== user.username;
+          
+          // If this is a received message with an encrypted session key, decrypt it first
+          if (isReceived && msg.encrypted_session_key) {
+            await SimpleCrypto.decryptAndStoreSessionKey(msg.encrypted_session_key, msg.sender_username);
+          }
+          
+          // Now decrypt the message
+          const decryptedContent = await SimpleCrypto.decrypt(msg.encrypted_content, msg.iv);
+          
+          return {
+            ...msg,
+            decrypted_content: decryptedContent,
+            type: isReceived ? 'received' : 'sent'
+          };
+        } catch (error) {
+          console.error('❌ Decrypt failed:', error.message);
+          return {
+            ...msg,
+            decrypted_content: '[Could not decrypt message]',
+            type: msg.sender_username !== user.username ? 'received' : 'sent',
+            decryption_failed: true
+          };
+        }
+      })
+    );
+  };
+
   const loadMessages = async (withUsername, showLoading = true) => {
     try {
       if (showLoading) {
@@ -64,41 +109,24 @@ function ChatWindow({ user, onLogout }) {
       }
       
       const response = await chatAPI.getMessages(withUsername);
-      const { SimpleCrypto } = await import('../utils/simple-crypto');
+      const decryptedMessages = await decryptMessages(response.data.messages);
       
-      const decryptedMessages = await Promise.all(
-        response.data.messages.map(async (msg) => {
-          try {
-            const isReceived = msg.sender_username !== user.username;
-            
-            // If this is a received message with an encrypted session key, decrypt it first
-            if (isReceived && msg.encrypted_session_key) {
-              await SimpleCrypto.decryptAndStoreSessionKey(msg.encrypted_session_key, msg.sender_username);
-            }
-            
-            // Now decrypt the message
-            const decryptedContent = await SimpleCrypto.decrypt(msg.encrypted_content, msg.iv);
-            
-            return {
-              ...msg,
-              decrypted_content: decryptedContent,
-              type: isReceived ? 'received' : 'sent'
-            };
-          } catch (error) {
-            console.error('❌ Decrypt failed:', error.message);
-            return {
-              ...msg,
-              decrypted_content: '[Could not decrypt message]',
-              type: msg.sender_username !== user.username ? 'received' : 'sent',
-              decryption_failed: true
-            };
-          }
-        })
-      );
+      // Remember the newest message (the API returns the latest page only)
+      const lastMessage = response.data.messages[response.data.messages.length - 1];
+      lastMessageIdRef.current = lastMessage ? lastMessage.id : null;
       
-      // Update message count reference
-      lastMessageCountRef.current = decryptedMessages.length;
-      setMessages(decryptedMessages);
+      if (showLoading) {
+        setMessages(decryptedMessages);
+        setHasOlderMessages(decryptedMessages.length === MESSAGES_PAGE_SIZE);
+      } else {
+        // Refresh: keep any older pages already loaded, replace the rest
+        // (including optimistically added messages) with the latest page
+        const firstId = decryptedMessages.length > 0 ? decryptedMessages[0].id : null;
+        setMessages(prev => [
+          ...(firstId !== null ? prev.filter(m => m.id < firstId) : []),
+          ...decryptedMessages
+        ]);
+      }
       
     } catch (error) {
       console.error('Error loading messages:', error);
@@ -109,13 +137,37 @@ function ChatWindow({ user, onLogout }) {
     }
   };
 
-  // Smart check for new messages - only updates if count changed
+  // Load the page of messages before the oldest one shown
+  const loadOlderMessages = async () => {
+    if (messages.length === 0) {
+      return;
+    }
+    
+    try {
+      setIsLoadingOlder(true);
+      
+      const response = await chatAPI.getMessages(activeConversation.contact_username, messages[0].id);
+      const olderMessages = await decryptMessages(response.data.messages);
+      
+      skipScrollRef.current = true;
+      setMessages(prev => [...olderMessages, ...prev]);
+      setHasOlderMessages(olderMessages.length === MESSAGES_PAGE_SIZE);
+      
+    } catch (error) {
+      console.error('Error loading older messages:', error);
+    } finally {
+      setIsLoadingOlder(false);
+    }
+  };
+
+  // Smart check for new messages - only updates if the newest message changed
   const checkForNewMessages = async (withUsername) => {
     try {
       const response = await chatAPI.getMessages(withUsername);
       
-      // Only reload if message count changed
-      if (response.data.messages.length !== lastMessageCountRef.current) {
+      // Only reload if the newest message changed
+      const lastMessage = response.data.messages[response.data.messages.length - 1];
+      if ((lastMessage ? lastMessage.id : null) !== lastMessageIdRef.current) {
         console.log('🔔 New messages detected! Refreshing...');
         await loadMessages(withUsername, false); // Don't show loading spinner
       }
@@ -183,7 +235,6 @@ function ChatWindow({ user, onLogout }) {
       };
 
       setMessages(prev => [...prev, newMsg]);
-      lastMessageCountRef.current += 1; // Update count to prevent duplicate on next poll
 
       // Refresh conversations to update last message time
       loadConversations();
@@ -254,6 +305,15 @@ function ChatWindow({ user, onLogout }) {
                 </div>
               ) : (
                 <>
+                  {hasOlderMessages && (
+                    <button
+                      className="load-older-btn"
+                      onClick={loadOlderMessages}
+                      disabled={isLoadingOlder}
+                    >
+                      {isLoadingOlder ? 'Loading...' : 'Load older messages'}
+                    </button>
+                  )}
                   {messages.map((message, index) => (
                     <div key={message.id || index} className={`message ${message.type}`}>
                       <div className="message-content">
@@ -58,9 +58,13 @@ export const chatAPI = {
   sendMessage: (messageData) =>
     api.post('/chat/send', messageData),
   
-  getMessages: (withUsername = null) =>
+  // Returns the newest page of messages, or the page before `beforeId`
+  getMessages: (withUsername = null, beforeId = null) =>
     api.get('/chat/messages', {
-      params: withUsername ? { with: withUsername } : {},
+      params: {
+        ...(withUsername ? { with: withUsername } : {}),
+        ...(beforeId ? { before_id: beforeId } : {}),
+      },
     }),
   
   getConversations: () =>